@@ -10,6 +10,7 @@ Gemini.
 from __future__ import annotations
 
 import base64
+import gzip
 import mimetypes
 from pathlib import Path
 from typing import AsyncIterator, Dict, List, Optional
@@ -18,27 +19,57 @@ import httpx
 from azure.functions import HttpRequest, HttpResponse
 
 from ..shared.config import GEMINI_API_KEY
+from ..shared.knowledge_blobs import ENCODING_GZIP, KNOWLEDGE_ROOT
+from ..shared.knowledge_store import STATUS_READY, list_knowledge_files
 
 
 GEMINI_API_ROOT = "https://generativelanguage.googleapis.com/v1beta/models"
-KNOWLEDGE_ROOT = Path(__file__).resolve().parent.parent / "knowledge"
+# Multiple of 3 so base64-encoded chunks can be concatenated without padding
+_READ_CHUNK_SIZE = 3 * 64 * 1024
+
+
+def _read_base64(path: Path, encoding: str) -> str:
+    """Return the base64 content of *path*, decompressing it if stored gzipped."""
+
+    opener = gzip.open if encoding == ENCODING_GZIP else open
+    chunks: List[str] = []
+    with opener(path, "rb") as fh:
+        while True:
+            chunk = fh.read(_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            chunks.append(base64.b64encode(chunk).decode())
+    return "".join(chunks)
 
 
 def _load_knowledge_parts(container_id: str) -> List[Dict[str, object]]:
-    """Load knowledge files for *container_id* and return inlineData parts."""
+    """Load knowledge files for *container_id* and return inlineData parts.
+
+    Files whose ingestion is still pending or has failed are skipped.
+    """
 
     parts: List[Dict[str, object]] = []
     knowledge_dir = KNOWLEDGE_ROOT / container_id
     if not knowledge_dir.exists():
         return parts
 
+    known = {f["id"]: f for f in list_knowledge_files(container_id)}
     for file in knowledge_dir.iterdir():
         if not file.is_file():
             continue
-        mime_type, _ = mimetypes.guess_type(file.name)
+        file_meta = known.get(file.name.split(".", 1)[0])
+        if file_meta and file_meta["status"] != STATUS_READY:
+            continue
+        if file_meta:
+            encoding = file_meta["encoding"]
+        else:
+            # Untracked file: compressed blobs carry ".gz" after the original suffix
+            encoding = ENCODING_GZIP if len(file.suffixes) > 1 and file.suffix == ".gz" else ""
+        original_name = file.name[: -len(".gz")] if encoding == ENCODING_GZIP else file.name
+        mime_type, _ = mimetypes.guess_type(original_name)
         if not mime_type:
             mime_type = "application/octet-stream"
-        data = base64.b64encode(file.read_bytes()).decode()
+        data = _read_base64(file, encoding)
         parts.append({"inlineData": {"mimeType": mime_type, "data": data}})
 
     return parts
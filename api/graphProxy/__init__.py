@@ -12,14 +12,12 @@ from __future__ import annotations
 from typing import AsyncIterator, Optional
 
 import httpx
-import msal
 from azure.functions import HttpRequest, HttpResponse
 
-from ..shared.config import MSAL_CLIENT_ID, MSAL_CLIENT_SECRET, MSAL_TENANT_ID
 from ..shared.session import decrypt_session
+from ..shared.token_refresh import token_refresher
 
 
-AUTHORITY = f"https://login.microsoftonline.com/{MSAL_TENANT_ID}"
 GRAPH_ROOT = "https://graph.microsoft.com/v1.0"
 
 
@@ -45,34 +43,11 @@ async def main(req: HttpRequest) -> HttpResponse:
     except Exception:
         return HttpResponse("Invalid session", status_code=401)
 
-    cache = msal.SerializableTokenCache()
-    serialized_cache = session.get("token_cache")
-    if serialized_cache:
-        cache.deserialize(serialized_cache)
-
-    app = msal.ConfidentialClientApplication(
-        MSAL_CLIENT_ID,
-        authority=AUTHORITY,
-        client_credential=MSAL_CLIENT_SECRET,
-        token_cache=cache,
-    )
-
-    account = None
-    home_account_id = session.get("home_account_id")
-    if home_account_id:
-        accounts = app.get_accounts(home_account_id=home_account_id)
-        if accounts:
-            account = accounts[0]
-
-    result = app.acquire_token_silent(
-        ["https://graph.microsoft.com/.default"], account=account
-    )
-
-    if not result or "access_token" not in result:
+    access_token = await token_refresher.get_token(session, ["https://graph.microsoft.com/.default"])
+    if not access_token:
         # Token could not be acquired silently; user interaction required
         return HttpResponse("Authentication required", status_code=401)
 
-    access_token = result["access_token"]
     url = f"{GRAPH_ROOT}{path}"
 
     headers = {"Authorization": f"Bearer {access_token}"}
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+from azure.functions import HttpRequest, HttpResponse
+
+from ..shared.config import KNOWLEDGE_INGEST_WORKERS
+from ..shared.ingest_queue import cancel_jobs
+from ..shared.knowledge_blobs import knowledge_file_path
+from ..shared.knowledge_store import delete_knowledge_files
+
+
+def _unlink(file_path: Path) -> None:
+    try:
+        file_path.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def main(req: HttpRequest) -> HttpResponse:
+    """Delete several knowledge base files in one request."""
+
+    try:
+        body = req.get_json()
+    except ValueError:
+        return HttpResponse("Invalid JSON body", status_code=400)
+
+    container_id = body.get("containerId")
+    file_ids = body.get("fileIds")
+    if not container_id or not isinstance(file_ids, list) or not file_ids:
+        return HttpResponse("Missing containerId or fileIds", status_code=400)
+
+    removed = delete_knowledge_files(container_id, file_ids)
+    cancel_jobs([f["id"] for f in removed])
+    paths = [
+        knowledge_file_path(container_id, f["id"], f["name"], f["encoding"]) for f in removed
+    ]
+    with ThreadPoolExecutor(max_workers=KNOWLEDGE_INGEST_WORKERS) as pool:
+        list(pool.map(_unlink, paths))
+
+    deleted_ids = {f["id"] for f in removed}
+    body = {
+        "deleted": [f["id"] for f in removed],
+        "notFound": [file_id for file_id in file_ids if file_id not in deleted_ids],
+    }
+    return HttpResponse(json.dumps(body), mimetype="application/json", status_code=200)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+from azure.functions import HttpRequest, HttpResponse
+
+from ..shared.config import KNOWLEDGE_CONTAINER_QUOTA_BYTES, KNOWLEDGE_GLOBAL_QUOTA_BYTES
+from ..shared.ingest_queue import enqueue_uploads
+from ..shared.knowledge_store import (
+    STATUS_PENDING,
+    QuotaExceededError,
+    add_knowledge_files,
+    delete_knowledge_files,
+)
+
+
+def main(req: HttpRequest) -> HttpResponse:
+    """Accept many knowledge base files and queue them for ingestion."""
+
+    try:
+        body = req.get_json()
+    except ValueError:
+        return HttpResponse("Invalid JSON body", status_code=400)
+
+    container_id = body.get("containerId")
+    files = body.get("files")
+    if not container_id or not isinstance(files, list) or not files:
+        return HttpResponse("Missing containerId or files", status_code=400)
+
+    try:
+        metadata = add_knowledge_files(
+            container_id,
+            files,
+            status=STATUS_PENDING,
+            container_quota=KNOWLEDGE_CONTAINER_QUOTA_BYTES,
+            global_quota=KNOWLEDGE_GLOBAL_QUOTA_BYTES,
+        )
+    except QuotaExceededError as exc:
+        return HttpResponse(str(exc), status_code=413)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status_code=404)
+    except (KeyError, TypeError) as exc:
+        return HttpResponse(f"Invalid file entry: {exc}", status_code=400)
+
+    try:
+        jobs = enqueue_uploads(container_id, list(zip(metadata, files)))
+    except Exception as exc:  # pragma: no cover - defensive cleanup
+        delete_knowledge_files(container_id, [m["id"] for m in metadata])
+        return HttpResponse(f"Failed to queue files: {exc}", status_code=500)
+
+    result = [{**meta, "jobId": job["id"]} for meta, job in zip(metadata, jobs)]
+    return HttpResponse(json.dumps(result), status_code=202, mimetype="application/json")
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 import json
-from pathlib import Path
 from azure.functions import HttpRequest, HttpResponse
 
+from ..shared.ingest_queue import cancel_jobs
+from ..shared.knowledge_blobs import knowledge_file_path
 from ..shared.knowledge_store import delete_knowledge_file, list_knowledge_files
 
-KNOWLEDGE_ROOT = Path(__file__).resolve().parent.parent / "knowledge"
-
 
 def main(req: HttpRequest) -> HttpResponse:
     """Delete a knowledge base file."""
@@ -28,9 +27,11 @@ def main(req: HttpRequest) -> HttpResponse:
         return HttpResponse("File not found", status_code=404)
 
     delete_knowledge_file(container_id, file_id)
+    cancel_jobs([file_id])
 
-    ext = Path(file_meta["name"]).suffix
-    file_path = KNOWLEDGE_ROOT / container_id / f"{file_id}{ext}"
+    file_path = knowledge_file_path(
+        container_id, file_id, file_meta["name"], file_meta["encoding"]
+    )
     if file_path.exists():
         try:
             file_path.unlink()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from collections import defaultdict
+import json
+from typing import Dict, List
+from azure.functions import HttpRequest, HttpResponse
+
+from ..shared.config import KNOWLEDGE_CONTAINER_QUOTA_BYTES, KNOWLEDGE_GLOBAL_QUOTA_BYTES
+from ..shared.knowledge_blobs import knowledge_file_path
+from ..shared.knowledge_store import delete_knowledge_files, plan_eviction
+
+
+def main(req: HttpRequest) -> HttpResponse:
+    """Evict the oldest knowledge files until storage fits a byte target.
+
+    The body may name a ``containerId`` to limit eviction to one container
+    and a ``targetBytes`` value; without it the configured quota is used.
+    This function requires the admin key.
+    """
+
+    try:
+        body = req.get_json()
+    except ValueError:
+        body = {}
+
+    container_id = body.get("containerId")
+    default_target = (
+        KNOWLEDGE_CONTAINER_QUOTA_BYTES if container_id else KNOWLEDGE_GLOBAL_QUOTA_BYTES
+    )
+    try:
+        target_bytes = int(body.get("targetBytes", default_target))
+    except (TypeError, ValueError):
+        return HttpResponse("Invalid targetBytes", status_code=400)
+    if target_bytes <= 0 and "targetBytes" not in body:
+        return HttpResponse("Missing targetBytes and no quota configured", status_code=400)
+
+    by_container: Dict[str, List[str]] = defaultdict(list)
+    for owner_id, file_meta in plan_eviction(max(target_bytes, 0), container_id):
+        by_container[owner_id].append(file_meta["id"])
+
+    evicted: List[str] = []
+    freed_bytes = 0
+    for owner_id, file_ids in by_container.items():
+        for file_meta in delete_knowledge_files(owner_id, file_ids):
+            path = knowledge_file_path(
+                owner_id, file_meta["id"], file_meta["name"], file_meta["encoding"]
+            )
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+            evicted.append(file_meta["id"])
+            freed_bytes += file_meta["storedSize"] or file_meta["size"]
+
+    result = {"evicted": evicted, "freedBytes": freed_bytes}
+    return HttpResponse(json.dumps(result), mimetype="application/json", status_code=200)
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from azure.functions import HttpRequest, HttpResponse
+
+from ..shared.knowledge_snapshot import (
+    SnapshotTooLargeError,
+    build_container_snapshot,
+    is_valid_container_id,
+)
+from ..shared.knowledge_store import container_exists
+
+
+def main(req: HttpRequest) -> HttpResponse:
+    """Return a ``.tar.gz`` snapshot of a container's knowledge base."""
+
+    container_id = req.params.get("containerId")
+    if not container_id:
+        return HttpResponse("Missing containerId", status_code=400)
+    if not is_valid_container_id(container_id):
+        return HttpResponse("Invalid containerId", status_code=400)
+    if not container_exists(container_id):
+        return HttpResponse("Container not found", status_code=404)
+
+    try:
+        snapshot = build_container_snapshot(container_id)
+    except SnapshotTooLargeError as exc:
+        return HttpResponse(str(exc), status_code=413)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{container_id}-knowledge.tar.gz"',
+    }
+    return HttpResponse(snapshot, status_code=200, headers=headers, mimetype="application/gzip")
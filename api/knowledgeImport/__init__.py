@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import io
+import json
+from azure.functions import HttpRequest, HttpResponse
+
+from ..shared.config import KNOWLEDGE_CONTAINER_QUOTA_BYTES, KNOWLEDGE_GLOBAL_QUOTA_BYTES
+from ..shared.knowledge_snapshot import import_container_snapshot, is_valid_container_id
+from ..shared.knowledge_store import QuotaExceededError, container_exists
+
+
+def main(req: HttpRequest) -> HttpResponse:
+    """Restore a snapshot produced by ``knowledgeExport`` into a container."""
+
+    container_id = req.params.get("containerId")
+    if not container_id:
+        return HttpResponse("Missing containerId", status_code=400)
+    if not is_valid_container_id(container_id):
+        return HttpResponse("Invalid containerId", status_code=400)
+    if not container_exists(container_id):
+        return HttpResponse("Container not found", status_code=404)
+
+    body = req.get_body()
+    if not body:
+        return HttpResponse("Missing snapshot body", status_code=400)
+
+    try:
+        files = import_container_snapshot(
+            container_id,
+            io.BytesIO(body),
+            container_quota=KNOWLEDGE_CONTAINER_QUOTA_BYTES,
+            global_quota=KNOWLEDGE_GLOBAL_QUOTA_BYTES,
+        )
+    except QuotaExceededError as exc:
+        return HttpResponse(str(exc), status_code=413)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status_code=400)
+
+    return HttpResponse(json.dumps(files), mimetype="application/json", status_code=200)
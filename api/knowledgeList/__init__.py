@@ -1,13 +1,52 @@
 from __future__ import annotations
 
 import json
+from collections import OrderedDict
+import threading
+from typing import Tuple
 from azure.functions import HttpRequest, HttpResponse
 
-from ..shared.knowledge_store import list_knowledge_files
+from ..shared.knowledge_store import (
+    container_exists,
+    get_knowledge_listing,
+    get_knowledge_version,
+    list_knowledge_changes,
+)
+
+# Serialized full listing per container, reused while its version is unchanged.
+# Only existing containers are cached and the least recently used entry is
+# evicted once LISTING_CACHE_SIZE is reached.
+LISTING_CACHE_SIZE = 256
+_listing_cache: OrderedDict[str, Tuple[int, str]] = OrderedDict()
+_listing_cache_lock = threading.Lock()
+
+
+def _full_listing(container_id: str) -> Tuple[int, str]:
+    with _listing_cache_lock:
+        cached = _listing_cache.get(container_id)
+        if cached and cached[0] == get_knowledge_version(container_id):
+            _listing_cache.move_to_end(container_id)
+            return cached
+    version, files = get_knowledge_listing(container_id)
+    listing = (version, json.dumps(files))
+    if container_exists(container_id):
+        with _listing_cache_lock:
+            _listing_cache[container_id] = listing
+            _listing_cache.move_to_end(container_id)
+            while len(_listing_cache) > LISTING_CACHE_SIZE:
+                _listing_cache.popitem(last=False)
+    return listing
 
 
 def main(req: HttpRequest) -> HttpResponse:
-    """Return metadata for all knowledge files in a container."""
+    """Return metadata for all knowledge files in a container.
+
+    Responses carry an ``ETag`` with the container version, so polling with
+    ``If-None-Match`` yields ``304 Not Modified`` while nothing changed.
+    With ``since=<version>`` only the files added or deleted after that
+    version are returned; ``full`` is set when the change log no longer
+    covers *since* and ``added`` holds the complete listing instead.
+    """
 
     container_id = req.params.get("containerId")
     if not container_id:
@@ -19,5 +58,30 @@ def main(req: HttpRequest) -> HttpResponse:
     if not container_id:
         return HttpResponse("Missing containerId", status_code=400)
 
-    files = list_knowledge_files(container_id)
-    return HttpResponse(json.dumps(files), mimetype="application/json", status_code=200)
+    since_param = req.params.get("since")
+    since = None
+    if since_param is not None:
+        try:
+            since = int(since_param)
+        except ValueError:
+            return HttpResponse("Invalid since parameter", status_code=400)
+
+    etag = f'"{get_knowledge_version(container_id)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if req.headers.get("If-None-Match") == etag:
+        return HttpResponse(status_code=304, headers=headers)
+
+    if since is None:
+        version, body = _full_listing(container_id)
+    else:
+        delta = list_knowledge_changes(container_id, since)
+        if delta is None:
+            version, files = get_knowledge_listing(container_id)
+            delta = {"version": version, "full": True, "added": files, "deleted": []}
+        else:
+            delta = {**delta, "full": False}
+        version, body = delta["version"], json.dumps(delta)
+
+    headers["ETag"] = f'"{version}"'
+
+    return HttpResponse(body, mimetype="application/json", status_code=200, headers=headers)
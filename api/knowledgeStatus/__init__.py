@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+from azure.functions import HttpRequest, HttpResponse
+
+from ..shared.ingest_queue import get_job, resume_pending_jobs
+from ..shared.knowledge_store import get_knowledge_file
+
+
+def main(req: HttpRequest) -> HttpResponse:
+    """Return the ingestion status of an uploaded knowledge file.
+
+    Callers either poll with the ``jobId`` returned by ``knowledgeUpload`` or
+    with ``containerId`` and ``fileId``.
+    """
+
+    resume_pending_jobs()
+
+    job_id = req.params.get("jobId")
+    if job_id:
+        job = get_job(job_id)
+        if not job:
+            return HttpResponse("Job not found", status_code=404)
+        return HttpResponse(json.dumps(job), mimetype="application/json", status_code=200)
+
+    container_id = req.params.get("containerId")
+    file_id = req.params.get("fileId")
+    if not container_id or not file_id:
+        return HttpResponse("Missing jobId or containerId and fileId", status_code=400)
+
+    file_meta = get_knowledge_file(container_id, file_id)
+    if not file_meta:
+        return HttpResponse("File not found", status_code=404)
+
+    body = {"id": file_meta["id"], "status": file_meta["status"]}
+    return HttpResponse(json.dumps(body), mimetype="application/json", status_code=200)
@@ -1,17 +1,20 @@
 from __future__ import annotations
 
-import base64
 import json
-from pathlib import Path
 from azure.functions import HttpRequest, HttpResponse
 
-from ..shared.knowledge_store import add_knowledge_file, delete_knowledge_file
-
-KNOWLEDGE_ROOT = Path(__file__).resolve().parent.parent / "knowledge"
+from ..shared.config import KNOWLEDGE_CONTAINER_QUOTA_BYTES, KNOWLEDGE_GLOBAL_QUOTA_BYTES
+from ..shared.ingest_queue import enqueue_upload
+from ..shared.knowledge_store import (
+    STATUS_PENDING,
+    QuotaExceededError,
+    add_knowledge_file,
+    delete_knowledge_file,
+)
 
 
 def main(req: HttpRequest) -> HttpResponse:
-    """Upload a knowledge base file and persist it."""
+    """Accept a knowledge base file and queue it for background ingestion."""
 
     try:
         body = req.get_json()
@@ -24,20 +27,28 @@ def main(req: HttpRequest) -> HttpResponse:
         return HttpResponse("Missing containerId or file", status_code=400)
 
     try:
-        metadata = add_knowledge_file(container_id, file)
+        metadata = add_knowledge_file(
+            container_id,
+            file,
+            status=STATUS_PENDING,
+            container_quota=KNOWLEDGE_CONTAINER_QUOTA_BYTES,
+            global_quota=KNOWLEDGE_GLOBAL_QUOTA_BYTES,
+        )
+    except QuotaExceededError as exc:
+        return HttpResponse(str(exc), status_code=413)
     except ValueError as exc:
         return HttpResponse(str(exc), status_code=404)
 
-    knowledge_dir = KNOWLEDGE_ROOT / container_id
-    knowledge_dir.mkdir(parents=True, exist_ok=True)
-    ext = Path(file["name"]).suffix
-    file_path = knowledge_dir / f"{metadata['id']}{ext}"
-
     try:
-        content_bytes = base64.b64decode(file.get("base64Content", ""))
-        file_path.write_bytes(content_bytes)
+        job = enqueue_upload(container_id, metadata, file)
     except Exception as exc:  # pragma: no cover - defensive cleanup
         delete_knowledge_file(container_id, metadata["id"])
-        return HttpResponse(f"Failed to save file: {exc}", status_code=500)
-
-    return HttpResponse(json.dumps(metadata), status_code=200, mimetype="application/json")
+        return HttpResponse(f"Failed to queue file: {exc}", status_code=500)
+
+    headers = {"Location": f"/api/knowledgeStatus?jobId={job['id']}"}
+    return HttpResponse(
+        json.dumps({**metadata, "jobId": job["id"]}),
+        status_code=202,
+        headers=headers,
+        mimetype="application/json",
+    )
@@ -25,3 +25,20 @@ SESSION_SECRET: str = _require_env("SESSION_SECRET")
 APP_URI: str = os.getenv("APP_URI", "")
 GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
 
+# Number of background threads processing knowledge uploads
+KNOWLEDGE_INGEST_WORKERS: int = int(os.getenv("KNOWLEDGE_INGEST_WORKERS", "4"))
+# Seconds finished ingestion job records are kept for status polling
+KNOWLEDGE_JOB_RETENTION_SECONDS: int = int(os.getenv("KNOWLEDGE_JOB_RETENTION_SECONDS", "86400"))
+# Largest container snapshot knowledgeExport builds, in stored bytes
+KNOWLEDGE_SNAPSHOT_MAX_BYTES: int = int(os.getenv("KNOWLEDGE_SNAPSHOT_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Seconds before expiry at which Graph access tokens are renewed in the background
+TOKEN_REFRESH_MARGIN_SECONDS: int = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# Accounts unused for this long are no longer renewed in the background
+TOKEN_REFRESH_IDLE_SECONDS: int = int(os.getenv("TOKEN_REFRESH_IDLE_SECONDS", "28800"))
+# Seconds to wait before retrying a failed background renewal
+TOKEN_REFRESH_RETRY_SECONDS: int = int(os.getenv("TOKEN_REFRESH_RETRY_SECONDS", "30"))
+
+# Byte quotas for stored knowledge files; 0 disables the limit
+KNOWLEDGE_CONTAINER_QUOTA_BYTES: int = int(os.getenv("KNOWLEDGE_CONTAINER_QUOTA_BYTES", "0"))
+KNOWLEDGE_GLOBAL_QUOTA_BYTES: int = int(os.getenv("KNOWLEDGE_GLOBAL_QUOTA_BYTES", "0"))
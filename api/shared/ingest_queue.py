@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+"""Background ingestion queue for knowledge uploads.
+
+Upload requests only register the file metadata as ``pending`` and spool the
+payload to ``knowledge/.jobs`` before responding.  A small thread pool then
+decodes the payload, writes the final file and marks it ``ready`` (or
+``failed``) in the knowledge store.  Because job records live on disk,
+pending jobs are picked up again by the first upload or status query after a
+restart.  Deleting a file cancels its pending job, and finished job records
+are removed once ``KNOWLEDGE_JOB_RETENTION_SECONDS`` have passed.
+
+Text-like files are gzip-compressed at rest, see :mod:`knowledge_blobs`.
+"""
+
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import gzip
+import json
+import logging
+from pathlib import Path
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import KNOWLEDGE_INGEST_WORKERS, KNOWLEDGE_JOB_RETENTION_SECONDS
+from .knowledge_blobs import (
+    ENCODING_GZIP,
+    JOBS_DIR,
+    is_compressible,
+    knowledge_file_path,
+    write_file_atomic,
+)
+from .knowledge_store import (
+    STATUS_FAILED,
+    STATUS_PENDING,
+    STATUS_READY,
+    get_knowledge_file,
+    import_knowledge_files,
+    update_knowledge_file,
+)
+
+
+JOB_ID_PATTERN = re.compile(r"job-[0-9a-f]{32}")
+# Job state for uploads whose file was deleted before ingestion finished
+STATUS_CANCELLED = "cancelled"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Pending job per file id and the jobs cancelled while a worker held them
+_jobs_lock = threading.Lock()
+_pending_by_file: Dict[str, str] = {}
+_cancelled_jobs: set = set()
+_last_cleanup = 0.0
+
+
+def _job_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.json"
+
+
+def _save_job(job: Dict[str, Any]) -> None:
+    write_file_atomic(_job_path(job["id"]), json.dumps(job).encode())
+
+
+def _load_job(job_id: str) -> Optional[Dict[str, Any]]:
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    try:
+        return json.loads(_job_path(job_id).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    # "file" is the metadata snapshot taken at upload time, only used for recovery
+    return {k: v for k, v in job.items() if k not in ("base64Content", "file")}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    created = False
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=KNOWLEDGE_INGEST_WORKERS,
+                thread_name_prefix="knowledge-ingest",
+            )
+            created = True
+    if created:
+        _recover_pending_jobs(_executor)
+    return _executor
+
+
+def _recover_pending_jobs(executor: ThreadPoolExecutor) -> None:
+    """Resubmit jobs that were still pending when the process stopped.
+
+    The knowledge store is in memory, so the metadata of recovered uploads is
+    registered again before their jobs run.
+    """
+
+    if not JOBS_DIR.exists():
+        return
+    for path in JOBS_DIR.glob("*.json"):
+        job = _load_job(path.stem)
+        if not job or job.get("status") != STATUS_PENDING:
+            continue
+        metadata = job.get("file")
+        if metadata and not get_knowledge_file(job["containerId"], job["fileId"]):
+            import_knowledge_files(job["containerId"], [metadata], create_container=True)
+        logging.info("Resuming knowledge ingestion job %s.", job["id"])
+        with _jobs_lock:
+            _pending_by_file[job["fileId"]] = job["id"]
+        executor.submit(_process_job, job["id"])
+    _cleanup_finished_jobs(force=True)
+
+
+def _cleanup_finished_jobs(force: bool = False) -> None:
+    """Delete finished job records older than the retention period.
+
+    Runs at most once per retention period unless *force* is set.
+    """
+
+    global _last_cleanup
+    now = time.time()
+    with _jobs_lock:
+        if not force and now - _last_cleanup < KNOWLEDGE_JOB_RETENTION_SECONDS:
+            return
+        _last_cleanup = now
+    if not JOBS_DIR.exists():
+        return
+
+    cutoff = now - KNOWLEDGE_JOB_RETENTION_SECONDS
+    for path in JOBS_DIR.iterdir():
+        try:
+            if path.stat().st_mtime >= cutoff:
+                continue
+            if path.suffix == ".json":
+                job = _load_job(path.stem)
+                if job and job.get("status") == STATUS_PENDING:
+                    continue
+            # Finished records and temp files left behind by a crash
+            path.unlink(missing_ok=True)
+        except OSError:
+            continue
+
+
+def _finish_job(job: Dict[str, Any]) -> None:
+    job.pop("base64Content", None)
+    job["completedAt"] = datetime.utcnow().isoformat()
+    _save_job(job)
+
+
+def _process_job(job_id: str) -> None:
+    job = _load_job(job_id)
+    if job is None or job.get("status") != STATUS_PENDING:
+        with _jobs_lock:
+            _cancelled_jobs.discard(job_id)
+        return
+
+    container_id = job["containerId"]
+    file_id = job["fileId"]
+    if not get_knowledge_file(container_id, file_id):
+        # The file was deleted before the worker picked the job up
+        job["status"] = STATUS_CANCELLED
+        _finish_job(job)
+        with _jobs_lock:
+            _pending_by_file.pop(file_id, None)
+            _cancelled_jobs.discard(job_id)
+        return
+
+    changes: Dict[str, Any] = {}
+    file_path: Optional[Path] = None
+    try:
+        content_bytes = base64.b64decode(job.get("base64Content", ""))
+        encoding = ""
+        if is_compressible(job.get("type", ""), job["name"]):
+            compressed = gzip.compress(content_bytes)
+            if len(compressed) < len(content_bytes):
+                content_bytes, encoding = compressed, ENCODING_GZIP
+        file_path = knowledge_file_path(container_id, file_id, job["name"], encoding)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(file_path, content_bytes)
+        job["status"] = STATUS_READY
+        changes = {"storedSize": len(content_bytes), "encoding": encoding}
+    except Exception as exc:
+        logging.exception("Knowledge ingestion job %s failed.", job_id)
+        job["status"] = STATUS_FAILED
+        job["error"] = str(exc)
+
+    with _jobs_lock:
+        cancelled = job_id in _cancelled_jobs
+        _cancelled_jobs.discard(job_id)
+        _pending_by_file.pop(file_id, None)
+    registered = not cancelled and update_knowledge_file(
+        container_id, file_id, status=job["status"], **changes
+    )
+    if not registered:
+        # Deleted while the blob was being written; do not leave it behind
+        if file_path is not None:
+            file_path.unlink(missing_ok=True)
+        job["status"] = STATUS_CANCELLED
+    _finish_job(job)
+    _cleanup_finished_jobs()
+
+
+def cancel_jobs(file_ids: List[str]) -> None:
+    """Cancel pending ingestion jobs of deleted files."""
+
+    with _jobs_lock:
+        job_ids = [_pending_by_file.pop(f, None) for f in file_ids]
+        job_ids = [j for j in job_ids if j]
+        _cancelled_jobs.update(job_ids)
+
+    for job_id in job_ids:
+        job = _load_job(job_id)
+        if job and job.get("status") == STATUS_PENDING:
+            job["status"] = STATUS_CANCELLED
+            _finish_job(job)
+
+
+def _spool_upload(container_id: str, metadata: Dict[str, Any], file: Dict[str, Any]) -> Dict[str, Any]:
+    job = {
+        "id": f"job-{uuid.uuid4().hex}",
+        "containerId": container_id,
+        "fileId": metadata["id"],
+        "name": metadata["name"],
+        "type": metadata["type"],
+        "status": STATUS_PENDING,
+        "createdAt": datetime.utcnow().isoformat(),
+        "file": metadata,
+        "base64Content": file.get("base64Content", ""),
+    }
+    _save_job(job)
+    with _jobs_lock:
+        _pending_by_file[metadata["id"]] = job["id"]
+    return job
+
+
+def enqueue_upload(container_id: str, metadata: Dict[str, Any], file: Dict[str, Any]) -> Dict[str, Any]:
+    """Spool *file* for background ingestion and return the job record.
+
+    *metadata* is the entry already registered in the knowledge store for the
+    upload; the job updates its status once processing finishes.
+    """
+
+    return enqueue_uploads(container_id, [(metadata, file)])[0]
+
+
+def enqueue_uploads(
+    container_id: str, uploads: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Spool several ``(metadata, file)`` pairs in parallel and queue them."""
+
+    if len(uploads) == 1:
+        jobs = [_spool_upload(container_id, *uploads[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=KNOWLEDGE_INGEST_WORKERS) as pool:
+            jobs = list(pool.map(lambda u: _spool_upload(container_id, *u), uploads))
+
+    executor = _get_executor()
+    for job in jobs:
+        executor.submit(_process_job, job["id"])
+    return [_public_job(job) for job in jobs]
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return the status record for *job_id* without its payload."""
+
+    job = _load_job(job_id)
+    return _public_job(job) if job else None
+
+
+def resume_pending_jobs() -> None:
+    """Start the workers, resuming jobs left pending by a previous process.
+
+    Only the first call has an effect.  Uploads call it implicitly; status
+    queries call it so interrupted jobs resume without a new upload.
+    """
+
+    _get_executor()
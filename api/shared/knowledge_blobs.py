@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+"""On-disk layout of knowledge files.
+
+Each container has a directory below ``KNOWLEDGE_ROOT`` holding one blob per
+file, named after the file id.  Text-like files are gzip-compressed at rest
+and stored with an extra ``.gz`` suffix; readers decompress them on the fly.
+Importing this module has no side effects.
+"""
+
+import mimetypes
+import os
+from pathlib import Path
+import shutil
+import uuid
+from typing import BinaryIO, Union
+
+
+KNOWLEDGE_ROOT = Path(__file__).resolve().parent.parent / "knowledge"
+# Job records and temp files; same file system as the blobs so renames are atomic
+JOBS_DIR = KNOWLEDGE_ROOT / ".jobs"
+
+ENCODING_GZIP = "gzip"
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "application/x-yaml",
+    "image/svg+xml",
+}
+
+
+def knowledge_blob_name(file_id: str, name: str, encoding: str = "") -> str:
+    """Return the file name under which a knowledge file is stored."""
+
+    blob_name = f"{file_id}{Path(name).suffix}"
+    return f"{blob_name}.gz" if encoding == ENCODING_GZIP else blob_name
+
+
+def knowledge_file_path(container_id: str, file_id: str, name: str, encoding: str = "") -> Path:
+    """Return the on-disk location of a knowledge file.
+
+    Raises ``ValueError`` if the ids would place it outside ``KNOWLEDGE_ROOT``.
+    """
+
+    path = KNOWLEDGE_ROOT / container_id / knowledge_blob_name(file_id, name, encoding)
+    if KNOWLEDGE_ROOT.resolve() not in path.resolve().parents:
+        raise ValueError(f"Invalid knowledge file location for container {container_id}.")
+    return path
+
+
+def is_compressible(mime_type: str, name: str = "") -> bool:
+    """Return whether files of *mime_type* are worth compressing at rest."""
+
+    if not mime_type and name:
+        mime_type, _ = mimetypes.guess_type(name)
+    mime_type = (mime_type or "").split(";")[0].strip().lower()
+    return mime_type.startswith("text/") or mime_type in COMPRESSIBLE_TYPES
+
+
+def new_temp_path() -> Path:
+    """Return an unused temp file path on the same file system as the blobs."""
+
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    return JOBS_DIR / f".{uuid.uuid4().hex}.tmp"
+
+
+def write_file_atomic(path: Path, data: Union[bytes, BinaryIO]) -> None:
+    """Write *data* to *path* so readers never observe a partial file.
+
+    *data* may be raw bytes or a binary file object that is copied in chunks.
+    """
+
+    tmp_path = new_temp_path()
+    try:
+        if isinstance(data, bytes):
+            tmp_path.write_bytes(data)
+        else:
+            with tmp_path.open("wb") as out:
+                shutil.copyfileobj(data, out)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+"""Snapshot export and import of a container's knowledge base.
+
+A snapshot is a gzip-compressed tar archive whose first member is
+``manifest.json`` (the container id and file metadata) followed by one
+``files/<fileId><ext>`` member per file.  Blobs are copied as stored, so
+compressed files stay compressed inside the snapshot.
+
+HTTP responses of Azure Functions must be ``bytes``, so exports are built in
+a temporary file capped at ``KNOWLEDGE_SNAPSHOT_MAX_BYTES`` and returned as a
+whole.  Imports validate the manifest first, stage the blobs in temp files
+and only move them into place once the whole archive has been read.
+"""
+
+import io
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from .config import KNOWLEDGE_SNAPSHOT_MAX_BYTES
+from .knowledge_blobs import (
+    ENCODING_GZIP,
+    knowledge_blob_name,
+    knowledge_file_path,
+    new_temp_path,
+)
+from .knowledge_store import (
+    STATUS_READY,
+    check_import_quota,
+    container_exists,
+    get_knowledge_file,
+    import_knowledge_files,
+    list_knowledge_files,
+)
+
+
+MANIFEST_NAME = "manifest.json"
+# Ids end up in file paths, so anything else is rejected
+CONTAINER_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,127}")
+FILE_ID_PATTERN = re.compile(r"file-[A-Za-z0-9-]+")
+
+_REQUIRED_FIELDS = {"id": str, "name": str, "type": str, "size": int, "uploadDate": str}
+_OPTIONAL_FIELDS = {"storedSize": int, "encoding": str}
+
+
+class SnapshotTooLargeError(Exception):
+    """Raised when a snapshot exceeds ``KNOWLEDGE_SNAPSHOT_MAX_BYTES``."""
+
+
+def is_valid_container_id(container_id: str) -> bool:
+    """Return whether *container_id* is safe to use as a directory name."""
+
+    return bool(CONTAINER_ID_PATTERN.fullmatch(container_id or ""))
+
+
+def _member_name(file_meta: Dict[str, Any]) -> str:
+    blob_name = knowledge_blob_name(
+        file_meta["id"], file_meta["name"], file_meta.get("encoding", "")
+    )
+    return f"files/{blob_name}"
+
+
+def _normalize_entry(entry: Any) -> Dict[str, Any]:
+    """Return the known metadata fields of a manifest *entry*.
+
+    Raises ``ValueError`` for missing or mistyped fields and unsafe ids.
+    """
+
+    if not isinstance(entry, dict):
+        raise ValueError("Invalid snapshot: manifest entries must be objects")
+    normalized: Dict[str, Any] = {}
+    for field_name, field_type in {**_REQUIRED_FIELDS, **_OPTIONAL_FIELDS}.items():
+        if field_name not in entry:
+            if field_name in _REQUIRED_FIELDS:
+                raise ValueError(f"Invalid snapshot: manifest entry is missing {field_name}")
+            continue
+        value = entry[field_name]
+        if not isinstance(value, field_type) or isinstance(value, bool):
+            raise ValueError(f"Invalid snapshot: {field_name} must be {field_type.__name__}")
+        normalized[field_name] = value
+    if not FILE_ID_PATTERN.fullmatch(normalized["id"]):
+        raise ValueError(f"Invalid snapshot: unsupported file id {normalized['id']!r}")
+    if normalized.get("encoding", "") not in ("", ENCODING_GZIP):
+        raise ValueError(f"Invalid snapshot: unsupported encoding {normalized['encoding']!r}")
+    normalized["status"] = STATUS_READY
+    return normalized
+
+
+def build_container_snapshot(container_id: str) -> bytes:
+    """Return a ``.tar.gz`` snapshot of *container_id*.
+
+    Only files that finished ingestion and still exist on disk are included.
+    Raises :class:`SnapshotTooLargeError` if the archive would exceed
+    ``KNOWLEDGE_SNAPSHOT_MAX_BYTES``.
+    """
+
+    files = [
+        f
+        for f in list_knowledge_files(container_id)
+        if f["status"] == STATUS_READY
+        and knowledge_file_path(container_id, f["id"], f["name"], f["encoding"]).is_file()
+    ]
+    stored_bytes = sum(f["storedSize"] or f["size"] for f in files)
+    if stored_bytes > KNOWLEDGE_SNAPSHOT_MAX_BYTES:
+        raise SnapshotTooLargeError(
+            f"Container {container_id} is too large to export ({stored_bytes} bytes)."
+        )
+
+    with tempfile.TemporaryFile() as archive:
+        with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+            manifest = json.dumps({"containerId": container_id, "files": files}).encode()
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(manifest)
+            tar.addfile(info, io.BytesIO(manifest))
+
+            for file_meta in files:
+                path = knowledge_file_path(
+                    container_id, file_meta["id"], file_meta["name"], file_meta["encoding"]
+                )
+                info = tarfile.TarInfo(_member_name(file_meta))
+                info.size = path.stat().st_size
+                with path.open("rb") as fh:
+                    tar.addfile(info, fh)
+        archive.seek(0)
+        return archive.read()
+
+
+def _install_blobs(staged: List[Tuple[Path, Path, Optional[Path]]]) -> List[Tuple[Path, Path]]:
+    """Move staged blobs into place, keeping the blobs they replace.
+
+    *staged* holds ``(temp_path, path, previous_path)`` triples where
+    *previous_path* is the blob of an already registered file with the same
+    id.  Returns ``(backup_path, previous_path)`` pairs for
+    :func:`_restore_blobs`; if moving fails midway, the moves done so far are
+    undone before the error propagates.
+    """
+
+    installed: List[Path] = []
+    backups: List[Tuple[Path, Path]] = []
+    try:
+        for tmp_path, path, previous_path in staged:
+            if previous_path is not None and previous_path.exists():
+                backup_path = new_temp_path()
+                os.replace(previous_path, backup_path)
+                backups.append((backup_path, previous_path))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+            installed.append(path)
+    except OSError:
+        _restore_blobs(installed, backups)
+        raise
+    return backups
+
+
+def _restore_blobs(installed: List[Path], backups: List[Tuple[Path, Path]]) -> None:
+    for path in installed:
+        path.unlink(missing_ok=True)
+    for backup_path, previous_path in backups:
+        os.replace(backup_path, previous_path)
+
+
+def import_container_snapshot(
+    container_id: str,
+    stream: BinaryIO,
+    container_quota: int = 0,
+    global_quota: int = 0,
+) -> List[Dict[str, Any]]:
+    """Restore a snapshot from *stream* into the existing *container_id*.
+
+    The manifest is validated and its declared sizes are checked against the
+    quotas before any blob is read; blobs larger than declared are
+    rejected.  Blobs are staged in temp files and only moved into place once
+    the whole archive was read and every file in the manifest had its blob.
+    Blobs of files that are re-imported are restored if registering the
+    metadata fails.  Raises ``ValueError`` if the container is unknown or the
+    stream is not a complete, valid snapshot and :class:`QuotaExceededError`
+    if a quota would be exceeded.
+    """
+
+    if not is_valid_container_id(container_id) or not container_exists(container_id):
+        raise ValueError(f"Container with ID {container_id} not found.")
+
+    try:
+        tar = tarfile.open(fileobj=stream, mode="r|*")
+    except tarfile.TarError as exc:
+        raise ValueError(f"Invalid snapshot: {exc}") from exc
+
+    restored: List[Dict[str, Any]] = []
+    staged: List[Tuple[Path, Path, Optional[Path]]] = []
+    try:
+        with tar:
+            first = tar.next()
+            if first is None or first.name != MANIFEST_NAME or not first.isfile():
+                raise ValueError("Invalid snapshot: manifest.json must come first")
+            manifest = json.load(tar.extractfile(first))
+            if not isinstance(manifest, dict) or not isinstance(manifest.get("files", []), list):
+                raise ValueError("Invalid snapshot: malformed manifest")
+            entries = [_normalize_entry(f) for f in manifest.get("files", [])]
+            check_import_quota(container_id, entries, container_quota, global_quota)
+            by_member = {_member_name(f): f for f in entries}
+
+            for member in tar:
+                file_meta = by_member.pop(member.name, None)
+                if not member.isfile() or file_meta is None:
+                    continue
+                if member.size > (file_meta.get("storedSize") or file_meta["size"]):
+                    raise ValueError(f"Invalid snapshot: {member.name} is larger than declared")
+                path = knowledge_file_path(
+                    container_id,
+                    file_meta["id"],
+                    file_meta["name"],
+                    file_meta.get("encoding", ""),
+                )
+                previous = get_knowledge_file(container_id, file_meta["id"])
+                previous_path = (
+                    knowledge_file_path(
+                        container_id, previous["id"], previous["name"], previous["encoding"]
+                    )
+                    if previous
+                    else None
+                )
+                tmp_path = new_temp_path()
+                staged.append((tmp_path, path, previous_path))
+                with tmp_path.open("wb") as out:
+                    shutil.copyfileobj(tar.extractfile(member), out)
+                restored.append({**file_meta, "storedSize": member.size})
+
+        if by_member:
+            missing = ", ".join(sorted(f["id"] for f in by_member.values()))
+            raise ValueError(f"Invalid snapshot: missing files {missing}")
+    except (tarfile.TarError, EOFError, zlib.error) as exc:
+        for tmp_path, _, _ in staged:
+            tmp_path.unlink(missing_ok=True)
+        raise ValueError(f"Invalid snapshot: {exc}") from exc
+    except Exception:
+        for tmp_path, _, _ in staged:
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    backups = _install_blobs(staged)
+    try:
+        files = import_knowledge_files(
+            container_id,
+            restored,
+            create_container=False,
+            container_quota=container_quota,
+            global_quota=global_quota,
+        )
+    except Exception:
+        _restore_blobs([path for _, path, _ in staged], backups)
+        raise
+    for backup_path, _ in backups:
+        backup_path.unlink(missing_ok=True)
+    return files
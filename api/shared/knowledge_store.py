@@ -4,34 +4,74 @@ from __future__ import annotations
 
 This module mirrors the behavior of the former TypeScript implementation
 (api/src/shared/knowledge.ts).  It keeps metadata for knowledge files in
-memory and stores the base64-encoded file contents separately.  The data
-is **not** persistent and will be lost when the process restarts.
+memory; the file contents are written to disk by the ingestion queue.  The
+metadata is **not** persistent and will be lost when the process restarts.
+
+Every change to a container's file list bumps the container ``version`` and
+is appended to a bounded change log so clients can fetch deltas instead of
+re-listing the whole container.
 """
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 import logging
+import threading
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+# Number of change log entries kept per container
+CHANGE_LOG_LIMIT = 1000
+
+_last_version = 0
+
+
+def _next_version() -> int:
+    """Return a new version, monotonic even across process restarts."""
+
+    global _last_version
+    _last_version = max(_last_version + 1, int(time.time() * 1000))
+    return _last_version
 
 
 @dataclass
 class KnowledgeFile:
-    """Metadata describing an uploaded knowledge base file."""
+    """Metadata describing an uploaded knowledge base file.
+
+    ``size`` is the logical size of the file while ``storedSize`` is the
+    number of bytes it occupies on disk, which is smaller when the file is
+    stored with ``encoding="gzip"``.  While a file is pending, ``storedSize``
+    reserves the decoded upload size for quota checks.
+    """
 
     id: str
     name: str
     type: str
     size: int
     uploadDate: str
+    status: str = "ready"
+    storedSize: int = 0
+    encoding: str = ""
 
 
 @dataclass
 class Container:
-    """Container holding a list of knowledge files."""
+    """Container holding a list of knowledge files.
+
+    ``changeLog`` holds ``(version, fileId, metadata)`` entries where
+    ``metadata`` is ``None`` for deletions.  It is complete for every version
+    after ``changeLogBase``.
+    """
 
     id: str
     knowledgeBase: List[KnowledgeFile]
+    version: int = field(default_factory=_next_version)
+    changeLog: List[Tuple[int, str, Optional[Dict[str, Any]]]] = field(default_factory=list)
+    changeLogBase: int = 0
+
+    def __post_init__(self) -> None:
+        self.changeLogBase = self.version
 
 
 @dataclass
@@ -43,19 +83,29 @@ class AppStatePayload:
 
 # Global in-memory state
 app_state: Optional[AppStatePayload] = None
-knowledge_files_content: Dict[str, str] = {}
+
+# Ingestion workers update file status from background threads
+_lock = threading.RLock()
+
+# Lifecycle of a knowledge file while it is being ingested
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class QuotaExceededError(Exception):
+    """Raised when new files would exceed a container or global byte quota."""
 
 
 def _ensure_state_loaded() -> None:
     """Lazy-initialize the in-memory state."""
 
-    global app_state, knowledge_files_content
+    global app_state
     if app_state is not None:
         return
 
     logging.info("Initializing in-memory backend state for the first time.")
     app_state = AppStatePayload(containers=[], branding={}, availableModels=[])
-    knowledge_files_content = {}
 
 
 def _get_container(container_id: str) -> Optional[Container]:
@@ -63,6 +113,72 @@ def _get_container(container_id: str) -> Optional[Container]:
     return next((c for c in app_state.containers if c.id == container_id), None)
 
 
+def _record_changes(container: Container, changes: List[Tuple[str, Optional[KnowledgeFile]]]) -> None:
+    """Bump the version of *container* once for a batch of file changes.
+
+    Must be called with ``_lock`` held.
+    """
+
+    container.version = _next_version()
+    container.changeLog.extend(
+        (container.version, file_id, asdict(file) if file else None)
+        for file_id, file in changes
+    )
+    overflow = len(container.changeLog) - CHANGE_LOG_LIMIT
+    if overflow > 0:
+        container.changeLogBase = container.changeLog[overflow - 1][0]
+        del container.changeLog[:overflow]
+
+
+def get_knowledge_version(container_id: str) -> int:
+    """Return the current version of *container_id* (``0`` if unknown)."""
+
+    container = _get_container(container_id)
+    return container.version if container else 0
+
+
+def get_knowledge_listing(container_id: str) -> Tuple[int, List[Dict[str, Any]]]:
+    """Return the current version of *container_id* with its file metadata."""
+
+    container = _get_container(container_id)
+    if not container:
+        return 0, []
+    with _lock:
+        return container.version, [asdict(f) for f in container.knowledgeBase]
+
+
+def list_knowledge_changes(container_id: str, since: int) -> Optional[Dict[str, Any]]:
+    """Return files added or deleted in *container_id* after version *since*.
+
+    Updated files are reported as added again.  Returns ``None`` when the
+    change log no longer reaches back to *since* (or *since* is unknown), in
+    which case the caller has to fall back to a full listing.
+    """
+
+    container = _get_container(container_id)
+    if not container:
+        return None
+    with _lock:
+        if since < container.changeLogBase or since > container.version:
+            return None
+        latest: Dict[str, Optional[Dict[str, Any]]] = {}
+        for version, file_id, metadata in container.changeLog:
+            if version > since:
+                latest.pop(file_id, None)
+                latest[file_id] = metadata
+        return {
+            "version": container.version,
+            "added": [m for m in latest.values() if m is not None],
+            "deleted": [file_id for file_id, m in latest.items() if m is None],
+        }
+
+
+def container_exists(container_id: str) -> bool:
+    """Return whether *container_id* is a known container."""
+
+    return _get_container(container_id) is not None
+
+
 def list_knowledge_files(container_id: str) -> List[Dict[str, Any]]:
     """Return metadata for all knowledge files of *container_id*."""
 
@@ -72,55 +188,265 @@ def list_knowledge_files(container_id: str) -> List[Dict[str, Any]]:
     return [asdict(f) for f in container.knowledgeBase]
 
 
-def add_knowledge_file(container_id: str, file_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Add a file to the knowledge base of *container_id*.
-
-    *file_data* must contain ``name``, ``type``, ``size`` and
-    ``base64Content`` fields.
-    """
+def get_knowledge_file(container_id: str, file_id: str) -> Optional[Dict[str, Any]]:
+    """Return metadata for a single file or ``None`` if it is unknown."""
 
     container = _get_container(container_id)
-    if container is None:
-        raise ValueError(f"Container with ID {container_id} not found.")
+    if not container:
+        return None
+    file = next((f for f in container.knowledgeBase if f.id == file_id), None)
+    return asdict(file) if file else None
 
-    new_file = KnowledgeFile(
+
+def _new_knowledge_file(file_data: Dict[str, Any], status: str) -> KnowledgeFile:
+    return KnowledgeFile(
         id=f"file-{int(datetime.utcnow().timestamp()*1000)}-{uuid.uuid4().hex[:8]}",
         name=file_data["name"],
         type=file_data["type"],
         size=int(file_data["size"]),
         uploadDate=datetime.utcnow().isoformat(),
+        status=status,
+        # Reserve the verified size, not the declared one, until ingestion records the real one
+        storedSize=_incoming_bytes(file_data),
     )
 
-    container.knowledgeBase.append(new_file)
-    knowledge_files_content[new_file.id] = file_data.get("base64Content", "")
-    return asdict(new_file)
 
+def _used_bytes(files: List[KnowledgeFile]) -> int:
+    # Pending files count with the size reserved for them on upload
+    return sum(f.storedSize or f.size for f in files if f.status != STATUS_FAILED)
 
-def delete_knowledge_file(container_id: str, file_id: str) -> None:
-    """Remove a file from the knowledge base."""
+
+def _incoming_bytes(file_data: Dict[str, Any]) -> int:
+    # Do not trust the declared size alone; base64 carries ~3 bytes per 4 chars
+    return max(int(file_data["size"]), len(file_data.get("base64Content", "")) * 3 // 4)
+
+
+def container_usage(container_id: str) -> int:
+    """Return the bytes used on disk by the files of *container_id*."""
 
     container = _get_container(container_id)
-    if container:
-        container.knowledgeBase = [f for f in container.knowledgeBase if f.id != file_id]
-    knowledge_files_content.pop(file_id, None)
+    return _used_bytes(container.knowledgeBase) if container else 0
+
+
+def total_usage() -> int:
+    """Return the bytes used on disk by all knowledge files."""
+
+    _ensure_state_loaded()
+    return sum(_used_bytes(c.knowledgeBase) for c in app_state.containers)
+
+
+def _check_quota(
+    container_id: str,
+    incoming: int,
+    container_quota: int,
+    global_quota: int,
+    replaced: int = 0,
+) -> None:
+    # *replaced* bytes are freed by the same update, e.g. re-imported file ids
+    if container_quota and container_usage(container_id) - replaced + incoming > container_quota:
+        raise QuotaExceededError(f"Container {container_id} would exceed its storage quota.")
+    if global_quota and total_usage() - replaced + incoming > global_quota:
+        raise QuotaExceededError("Knowledge storage quota exceeded.")
+
+
+def check_import_quota(
+    container_id: str,
+    files: List[Dict[str, Any]],
+    container_quota: int = 0,
+    global_quota: int = 0,
+) -> None:
+    """Raise :class:`QuotaExceededError` if importing *files* would exceed a quota.
+
+    Sizes are taken from the metadata (``storedSize`` or ``size``), which lets
+    callers reject an import before writing any file.
+    """
+
+    incoming = sum(f.get("storedSize") or f["size"] for f in files)
+    with _lock:
+        container = _get_container(container_id)
+        replaced = _replaced_bytes(container, {f["id"] for f in files}) if container else 0
+        _check_quota(container_id, incoming, container_quota, global_quota, replaced)
 
 
-def get_knowledge_files_with_content(container_id: str) -> List[Dict[str, Any]]:
-    """Return metadata along with base64 content for all files."""
+def _replaced_bytes(container: Container, file_ids: Set[str]) -> int:
+    return _used_bytes([f for f in container.knowledgeBase if f.id in file_ids])
+
+
+def add_knowledge_file(
+    container_id: str,
+    file_data: Dict[str, Any],
+    status: str = STATUS_READY,
+    container_quota: int = 0,
+    global_quota: int = 0,
+) -> Dict[str, Any]:
+    """Add a file to the knowledge base of *container_id*.
+
+    *file_data* must contain ``name``, ``type``, ``size`` and
+    ``base64Content`` fields.  Files that are still being ingested should be
+    added with ``status=STATUS_PENDING``.  Non-zero quotas are enforced in
+    bytes and raise :class:`QuotaExceededError` when exceeded.
+    """
+
+    return add_knowledge_files(
+        container_id,
+        [file_data],
+        status=status,
+        container_quota=container_quota,
+        global_quota=global_quota,
+    )[0]
+
+
+def add_knowledge_files(
+    container_id: str,
+    files_data: List[Dict[str, Any]],
+    status: str = STATUS_READY,
+    container_quota: int = 0,
+    global_quota: int = 0,
+) -> List[Dict[str, Any]]:
+    """Add several files to *container_id* in a single metadata update."""
+
+    container = _get_container(container_id)
+    if container is None:
+        raise ValueError(f"Container with ID {container_id} not found.")
+
+    new_files = [_new_knowledge_file(f, status) for f in files_data]
+    incoming = sum(f.storedSize for f in new_files)
+    with _lock:
+        _check_quota(container_id, incoming, container_quota, global_quota)
+        container.knowledgeBase = container.knowledgeBase + new_files
+        _record_changes(container, [(f.id, f) for f in new_files])
+    return [asdict(f) for f in new_files]
+
+
+def import_knowledge_files(
+    container_id: str,
+    files: List[Dict[str, Any]],
+    create_container: bool = True,
+    container_quota: int = 0,
+    global_quota: int = 0,
+) -> List[Dict[str, Any]]:
+    """Register existing file metadata, e.g. from a container snapshot.
+
+    Unlike :func:`add_knowledge_file` the ids are preserved.  Entries with an
+    id that is already registered replace the previous metadata.  A missing
+    container is created when *create_container* is set, otherwise
+    ``ValueError`` is raised.  Non-zero quotas are enforced as in
+    :func:`add_knowledge_files`.
+    """
+
+    _ensure_state_loaded()
+    imported = [KnowledgeFile(**f) for f in files]
+    imported_ids = {f.id for f in imported}
+    with _lock:
+        container = _get_container(container_id)
+        is_new = container is None
+        if container is None:
+            if not create_container:
+                raise ValueError(f"Container with ID {container_id} not found.")
+            container = Container(id=container_id, knowledgeBase=[])
+        _check_quota(
+            container_id,
+            _used_bytes(imported),
+            container_quota,
+            global_quota,
+            _replaced_bytes(container, imported_ids),
+        )
+        if is_new:
+            app_state.containers.append(container)
+        container.knowledgeBase = [
+            f for f in container.knowledgeBase if f.id not in imported_ids
+        ] + imported
+        _record_changes(container, [(f.id, f) for f in imported])
+    return [asdict(f) for f in imported]
+
+
+def update_knowledge_file(container_id: str, file_id: str, **changes: Any) -> bool:
+    """Update metadata fields of a file, e.g. its status or stored size.
+
+    Returns ``False`` when the file is no longer registered, e.g. because it
+    was deleted while its ingestion job was still running.
+    """
 
     container = _get_container(container_id)
     if not container:
-        return []
-    return [
-        {**asdict(f), "base64Content": knowledge_files_content.get(f.id, "")}
-        for f in container.knowledgeBase
-    ]
+        return False
+    with _lock:
+        file = next((f for f in container.knowledgeBase if f.id == file_id), None)
+        if file is None:
+            return False
+        for field_name, value in changes.items():
+            setattr(file, field_name, value)
+        _record_changes(container, [(file.id, file)])
+    return True
+
+
+def set_knowledge_file_status(container_id: str, file_id: str, status: str) -> bool:
+    """Update the ingestion status of a file."""
+
+    return update_knowledge_file(container_id, file_id, status=status)
+
+
+def delete_knowledge_file(container_id: str, file_id: str) -> None:
+    """Remove a file from the knowledge base."""
+
+    delete_knowledge_files(container_id, [file_id])
+
+
+def delete_knowledge_files(container_id: str, file_ids: List[str]) -> List[Dict[str, Any]]:
+    """Remove several files at once and return the metadata of those removed."""
+
+    ids = set(file_ids)
+    container = _get_container(container_id)
+    removed: List[KnowledgeFile] = []
+    with _lock:
+        if container:
+            removed = [f for f in container.knowledgeBase if f.id in ids]
+            container.knowledgeBase = [f for f in container.knowledgeBase if f.id not in ids]
+            if removed:
+                _record_changes(container, [(f.id, None) for f in removed])
+    return [asdict(f) for f in removed]
+
+
+def plan_eviction(target_bytes: int, container_id: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Pick the oldest ready files to drop until usage fits *target_bytes*.
+
+    Usage is measured for *container_id* or across all containers when it is
+    ``None``.  Returns ``(container_id, metadata)`` pairs; the caller is
+    responsible for deleting them.
+    """
+
+    _ensure_state_loaded()
+    with _lock:
+        if container_id is None:
+            containers = list(app_state.containers)
+        else:
+            container = _get_container(container_id)
+            containers = [container] if container else []
+
+        usage = sum(_used_bytes(c.knowledgeBase) for c in containers)
+        candidates = sorted(
+            (
+                (f.uploadDate, c.id, f)
+                for c in containers
+                for f in c.knowledgeBase
+                if f.status == STATUS_READY
+            ),
+            key=lambda item: item[0],
+        )
+
+        evicted: List[Tuple[str, Dict[str, Any]]] = []
+        for _, owner_id, file in candidates:
+            if usage <= target_bytes:
+                break
+            usage -= file.storedSize or file.size
+            evicted.append((owner_id, asdict(file)))
+    return evicted
 
 
 def initialize_state(initial_state: Dict[str, Any]) -> None:
     """Re-initialize the in-memory state using *initial_state* payload."""
 
-    global app_state, knowledge_files_content
+    global app_state
     logging.info("Backend in-memory state is being re-initialized.")
 
     containers: List[Container] = []
@@ -128,9 +454,9 @@ def initialize_state(initial_state: Dict[str, Any]) -> None:
         kb = [KnowledgeFile(**f) for f in c.get("knowledgeBase", [])]
         containers.append(Container(id=c["id"], knowledgeBase=kb))
 
-    app_state = AppStatePayload(
-        containers=containers,
-        branding=initial_state.get("branding", {}),
-        availableModels=initial_state.get("availableModels", []),
-    )
-    knowledge_files_content = {}
+    with _lock:
+        app_state = AppStatePayload(
+            containers=containers,
+            branding=initial_state.get("branding", {}),
+            availableModels=initial_state.get("availableModels", []),
+        )
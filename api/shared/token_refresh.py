@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+"""Background refresh of delegated Graph access tokens.
+
+``acquire_token_silent`` performs a blocking refresh-token request against
+the identity provider whenever the cached access token is about to expire.
+:class:`TokenRefresher` keeps the latest token per account and scope set in
+memory and renews it in a worker thread shortly before it expires, so
+requests normally read a ready token and never wait on the network.
+Concurrent refreshes for the same account are coalesced into one request.
+
+Renewal is scheduled with a timer at ``expires_on - margin``.  Accounts that
+have not been used for ``TOKEN_REFRESH_IDLE_SECONDS`` are dropped instead of
+renewed, so the next request of a long idle user does wait for the identity
+provider; this bounds background traffic to recently active users.  After a
+failed renewal the current token keeps being served and no new attempt is
+made for ``TOKEN_REFRESH_RETRY_SECONDS``.
+"""
+
+import asyncio
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import msal
+
+from .config import (
+    MSAL_CLIENT_ID,
+    MSAL_CLIENT_SECRET,
+    MSAL_TENANT_ID,
+    TOKEN_REFRESH_IDLE_SECONDS,
+    TOKEN_REFRESH_MARGIN_SECONDS,
+    TOKEN_REFRESH_RETRY_SECONDS,
+)
+
+
+AUTHORITY = f"https://login.microsoftonline.com/{MSAL_TENANT_ID}"
+_Key = Tuple[str, Tuple[str, ...]]
+# Runs a callback after a delay in seconds and returns a handle with cancel()
+Scheduler = Callable[[float, Callable[[], None]], Any]
+
+
+@dataclass
+class _CachedToken:
+    app: Any
+    cache_source: Optional[str]
+    access_token: str
+    expires_on: float
+    last_used: float
+    timer: Any = None
+    # No background renewal is attempted before this time after a failure
+    retry_after: float = 0.0
+
+
+def _call_later(delay: float, callback: Callable[[], None]) -> asyncio.TimerHandle:
+    return asyncio.get_running_loop().call_later(delay, callback)
+
+
+def _build_app(serialized_cache: Optional[str]) -> msal.ConfidentialClientApplication:
+    cache = msal.SerializableTokenCache()
+    if serialized_cache:
+        cache.deserialize(serialized_cache)
+    return msal.ConfidentialClientApplication(
+        MSAL_CLIENT_ID,
+        authority=AUTHORITY,
+        client_credential=MSAL_CLIENT_SECRET,
+        token_cache=cache,
+    )
+
+
+def _acquire(
+    app: Any, home_account_id: Optional[str], scopes: Tuple[str, ...], force_refresh: bool
+) -> Optional[Dict[str, Any]]:
+    account = None
+    if home_account_id:
+        accounts = app.get_accounts(home_account_id=home_account_id)
+        if accounts:
+            account = accounts[0]
+    return app.acquire_token_silent(list(scopes), account=account, force_refresh=force_refresh)
+
+
+class TokenRefresher:
+    """Serve access tokens from memory and renew them ahead of expiry.
+
+    *app_factory* builds an MSAL client from a serialized token cache,
+    *clock* returns the current time in seconds and *scheduler* runs the
+    renewal timers; all three can be replaced to run against a local token
+    endpoint with a controllable clock.
+    """
+
+    def __init__(
+        self,
+        app_factory: Callable[[Optional[str]], Any] = _build_app,
+        clock: Callable[[], float] = time.time,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN_SECONDS,
+        idle_timeout: float = TOKEN_REFRESH_IDLE_SECONDS,
+        scheduler: Scheduler = _call_later,
+        retry_backoff: float = TOKEN_REFRESH_RETRY_SECONDS,
+    ) -> None:
+        self._app_factory = app_factory
+        self._clock = clock
+        self._refresh_margin = refresh_margin
+        self._idle_timeout = idle_timeout
+        self._scheduler = scheduler
+        self._retry_backoff = retry_backoff
+        self._tokens: Dict[_Key, _CachedToken] = {}
+        self._inflight: Dict[_Key, asyncio.Future] = {}
+        # Latest serialized MSAL cache seen per account, used for the next refresh
+        self._cache_sources: Dict[_Key, Optional[str]] = {}
+
+    async def get_token(self, session: Dict[str, Any], scopes: Iterable[str]) -> Optional[str]:
+        """Return an access token for *session* or ``None`` if sign-in is required."""
+
+        scope_key = tuple(sorted(scopes))
+        home_account_id = session.get("home_account_id")
+        if not home_account_id:
+            # Nothing to key the cache on; fall back to a one-off lookup
+            loop = asyncio.get_running_loop()
+            _, result = await loop.run_in_executor(
+                None, self._acquire_with, None, session.get("token_cache"), None, scope_key, False
+            )
+            return result.get("access_token") if result else None
+
+        key = (home_account_id, scope_key)
+        self._cache_sources[key] = session.get("token_cache")
+        cached = self._tokens.get(key)
+        now = self._clock()
+        if cached and cached.expires_on > now:
+            cached.last_used = now
+            if cached.expires_on - now <= self._refresh_margin and now >= cached.retry_after:
+                # Still valid: renew in the background and serve the current token
+                self._start_refresh(key)
+            return cached.access_token
+
+        cached = await asyncio.shield(self._start_refresh(key))
+        return cached.access_token if cached else None
+
+    def _start_refresh(self, key: _Key) -> asyncio.Future:
+        """Return the in-flight refresh for *key*, starting one if needed."""
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._refresh(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    def _schedule(self, key: _Key, token: _CachedToken) -> None:
+        delay = max(token.expires_on - self._refresh_margin - self._clock(), 0)
+        token.timer = self._scheduler(delay, lambda: self._on_timer(key, token))
+
+    def _on_timer(self, key: _Key, token: _CachedToken) -> None:
+        if self._tokens.get(key) is not token:
+            return
+        if self._clock() - token.last_used > self._idle_timeout:
+            # Not used recently: let it expire instead of renewing it forever
+            del self._tokens[key]
+            self._cache_sources.pop(key, None)
+            return
+        self._start_refresh(key)
+
+    def _acquire_with(
+        self,
+        app: Any,
+        cache_source: Optional[str],
+        home_account_id: Optional[str],
+        scopes: Tuple[str, ...],
+        force_refresh: bool,
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Build the MSAL client if needed and acquire a token; runs in a thread."""
+
+        if app is None:
+            app = self._app_factory(cache_source)
+        return app, _acquire(app, home_account_id, scopes, force_refresh)
+
+    async def _refresh(self, key: _Key) -> Optional[_CachedToken]:
+        home_account_id, scopes = key
+        cached = self._tokens.get(key)
+        cache_source = self._cache_sources.get(key)
+        # A newer session (e.g. after re-consent) carries its own token cache
+        app = cached.app if cached and cached.cache_source == cache_source else None
+
+        loop = asyncio.get_running_loop()
+        try:
+            # A token we already hold is close to expiry, so bypass MSAL's copy of it
+            force_refresh = cached is not None
+            app, result = await loop.run_in_executor(
+                None, self._acquire_with, app, cache_source, home_account_id, scopes, force_refresh
+            )
+        except Exception:
+            logging.exception("Token refresh failed for account %s.", home_account_id)
+            result = None
+
+        now = self._clock()
+        if not result or "access_token" not in result:
+            if cached and cached.expires_on > now:
+                # Keep serving it and retry after the backoff, at the latest on expiry
+                cached.retry_after = now + self._retry_backoff
+                if cached.timer is not None:
+                    cached.timer.cancel()
+                cached.timer = self._scheduler(
+                    min(self._retry_backoff, cached.expires_on - now),
+                    lambda: self._on_timer(key, cached),
+                )
+                return cached
+            self._tokens.pop(key, None)
+            self._cache_sources.pop(key, None)
+            return None
+
+        refreshed = _CachedToken(
+            app=app,
+            cache_source=cache_source,
+            access_token=result["access_token"],
+            expires_on=now + int(result.get("expires_in", 0)),
+            last_used=cached.last_used if cached else now,
+        )
+        if cached and cached.timer is not None:
+            cached.timer.cancel()
+        self._tokens[key] = refreshed
+        self._schedule(key, refreshed)
+        return refreshed
+
+
+token_refresher = TokenRefresher()
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+# shared.config requires these at import time
+for _name in ("MSAL_CLIENT_ID", "MSAL_CLIENT_SECRET", "MSAL_TENANT_ID", "SESSION_SECRET"):
+    os.environ.setdefault(_name, "test")
+
+
+@pytest.fixture
+def knowledge_root(tmp_path, monkeypatch):
+    """Point blob storage at *tmp_path* and start from an empty store."""
+
+    from shared import knowledge_blobs, knowledge_store
+
+    monkeypatch.setattr(knowledge_blobs, "KNOWLEDGE_ROOT", tmp_path)
+    monkeypatch.setattr(knowledge_blobs, "JOBS_DIR", tmp_path / ".jobs")
+    monkeypatch.setattr(knowledge_store, "app_state", None)
+    return tmp_path
@@ -0,0 +1,66 @@
+import importlib
+import json
+from pathlib import Path
+import sys
+
+import azure.functions as func
+import pytest
+
+# Function folders use relative imports of ``..shared``, so load them through
+# the app directory as a package, the way the Functions host does.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+knowledge_list = importlib.import_module("api.knowledgeList")
+knowledge_store = importlib.import_module("api.shared.knowledge_store")
+
+
+CONTAINER_ID = "workspace-1"
+
+
+@pytest.fixture
+def container(monkeypatch):
+    monkeypatch.setattr(knowledge_store, "app_state", None)
+    monkeypatch.setattr(knowledge_list, "_listing_cache", type(knowledge_list._listing_cache)())
+    knowledge_store.initialize_state({"containers": [{"id": CONTAINER_ID, "knowledgeBase": []}]})
+    knowledge_store.add_knowledge_file(
+        CONTAINER_ID, {"name": "a.txt", "type": "text/plain", "size": 1}
+    )
+    return CONTAINER_ID
+
+
+def _get(params, headers=None) -> func.HttpResponse:
+    req = func.HttpRequest(
+        method="GET", url="/api/knowledgeList", params=params, headers=headers or {}, body=b""
+    )
+    return knowledge_list.main(req)
+
+
+def test_unchanged_listing_returns_not_modified(container):
+    first = _get({"containerId": container})
+    etag = first.headers["ETag"]
+
+    second = _get({"containerId": container}, {"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert etag == f'"{knowledge_store.get_knowledge_version(container)}"'
+    assert second.status_code == 304
+    assert second.get_body() == b""
+
+
+def test_changed_listing_is_served_again(container):
+    etag = _get({"containerId": container}).headers["ETag"]
+    knowledge_store.add_knowledge_file(
+        container, {"name": "b.txt", "type": "text/plain", "size": 1}
+    )
+
+    resp = _get({"containerId": container}, {"If-None-Match": etag})
+
+    assert resp.status_code == 200
+    assert [f["name"] for f in json.loads(resp.get_body())] == ["a.txt", "b.txt"]
+
+
+def test_stale_since_falls_back_to_full_listing(container):
+    resp = _get({"containerId": container, "since": "1"})
+
+    body = json.loads(resp.get_body())
+    assert body["full"] is True
+    assert [f["name"] for f in body["added"]] == ["a.txt"]
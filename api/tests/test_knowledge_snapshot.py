@@ -0,0 +1,105 @@
+import io
+import json
+import tarfile
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from shared import knowledge_snapshot, knowledge_store
+from shared.knowledge_blobs import knowledge_file_path, write_file_atomic
+from shared.knowledge_snapshot import import_container_snapshot
+
+
+CONTAINER_ID = "workspace-1"
+
+
+def _entry(file_id: str, size: int = 5) -> Dict[str, Any]:
+    return {
+        "id": file_id,
+        "name": "notes.bin",
+        "type": "application/octet-stream",
+        "size": size,
+        "uploadDate": "2024-01-01T00:00:00",
+    }
+
+
+def _snapshot(files: List[Dict[str, Any]], blobs: List[Tuple[str, bytes]]) -> io.BytesIO:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        manifest = json.dumps({"containerId": CONTAINER_ID, "files": files}).encode()
+        info = tarfile.TarInfo("manifest.json")
+        info.size = len(manifest)
+        tar.addfile(info, io.BytesIO(manifest))
+        for file_id, data in blobs:
+            info = tarfile.TarInfo(f"files/{file_id}.bin")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+
+def _blob(file_id: str) -> bytes:
+    return knowledge_file_path(CONTAINER_ID, file_id, "notes.bin").read_bytes()
+
+
+@pytest.fixture
+def container(knowledge_root):
+    """A container holding file-1 and file-2 with their original blobs."""
+
+    knowledge_store.initialize_state({"containers": [{"id": CONTAINER_ID, "knowledgeBase": []}]})
+    (knowledge_root / CONTAINER_ID).mkdir()
+    for file_id, data in (("file-1", b"old-1"), ("file-2", b"old-2")):
+        write_file_atomic(knowledge_file_path(CONTAINER_ID, file_id, "notes.bin"), data)
+    knowledge_store.import_knowledge_files(
+        CONTAINER_ID, [{**_entry(f), "storedSize": 5} for f in ("file-1", "file-2")]
+    )
+    return knowledge_root
+
+
+def test_reimport_replaces_blobs(container):
+    snapshot = _snapshot(
+        [_entry("file-1"), _entry("file-2")], [("file-1", b"new-1"), ("file-2", b"new-2")]
+    )
+
+    files = import_container_snapshot(CONTAINER_ID, snapshot)
+
+    assert [f["id"] for f in files] == ["file-1", "file-2"]
+    assert (_blob("file-1"), _blob("file-2")) == (b"new-1", b"new-2")
+    assert list((container / ".jobs").iterdir()) == []
+
+
+def test_failed_reimport_keeps_existing_blobs(container):
+    snapshot = _snapshot(
+        [_entry("file-1"), _entry("file-2")], [("file-1", b"new-1"), ("file-2", b"too-large")]
+    )
+
+    with pytest.raises(ValueError, match="larger than declared"):
+        import_container_snapshot(CONTAINER_ID, snapshot)
+
+    assert (_blob("file-1"), _blob("file-2")) == (b"old-1", b"old-2")
+    assert list((container / ".jobs").iterdir()) == []
+
+
+def test_missing_blob_is_rejected(container):
+    snapshot = _snapshot([_entry("file-1"), _entry("file-3")], [("file-1", b"new-1")])
+
+    with pytest.raises(ValueError, match="missing files file-3"):
+        import_container_snapshot(CONTAINER_ID, snapshot)
+
+    assert _blob("file-1") == b"old-1"
+    assert len(knowledge_store.list_knowledge_files(CONTAINER_ID)) == 2
+
+
+def test_blobs_are_restored_when_registration_fails(container, monkeypatch):
+    def reject(*args, **kwargs):
+        raise knowledge_store.QuotaExceededError("quota")
+
+    monkeypatch.setattr(knowledge_snapshot, "import_knowledge_files", reject)
+    snapshot = _snapshot(
+        [_entry("file-1"), _entry("file-2")], [("file-1", b"new-1"), ("file-2", b"new-2")]
+    )
+
+    with pytest.raises(knowledge_store.QuotaExceededError):
+        import_container_snapshot(CONTAINER_ID, snapshot)
+
+    assert (_blob("file-1"), _blob("file-2")) == (b"old-1", b"old-2")
@@ -0,0 +1,108 @@
+import base64
+
+import pytest
+
+from shared import knowledge_store
+from shared.knowledge_store import (
+    STATUS_PENDING,
+    STATUS_READY,
+    QuotaExceededError,
+    add_knowledge_file,
+    container_usage,
+    delete_knowledge_file,
+    get_knowledge_version,
+    list_knowledge_changes,
+    update_knowledge_file,
+)
+
+
+CONTAINER_ID = "workspace-1"
+
+
+@pytest.fixture
+def container(knowledge_root):
+    knowledge_store.initialize_state({"containers": [{"id": CONTAINER_ID, "knowledgeBase": []}]})
+    return CONTAINER_ID
+
+
+def _upload(size: int, declared_size: int) -> dict:
+    return {
+        "name": "notes.bin",
+        "type": "application/octet-stream",
+        "size": declared_size,
+        "base64Content": base64.b64encode(b"x" * size).decode(),
+    }
+
+
+def test_pending_uploads_reserve_their_decoded_size(container):
+    accepted = []
+    with pytest.raises(QuotaExceededError):
+        for _ in range(10):
+            accepted.append(
+                add_knowledge_file(
+                    container, _upload(1000, declared_size=1), STATUS_PENDING, container_quota=2500
+                )
+            )
+
+    assert len(accepted) == 2
+    assert 2000 <= container_usage(container) <= 2500
+
+
+def test_ingestion_replaces_the_reservation_with_the_stored_size(container):
+    metadata = add_knowledge_file(container, _upload(1000, declared_size=1000), STATUS_PENDING)
+
+    update_knowledge_file(container, metadata["id"], status=STATUS_READY, storedSize=120)
+
+    assert container_usage(container) == 120
+
+
+def _add(container: str, name: str) -> str:
+    return add_knowledge_file(container, {"name": name, "type": "text/plain", "size": 1})["id"]
+
+
+def test_change_log_is_trimmed_to_its_limit(container, monkeypatch):
+    monkeypatch.setattr(knowledge_store, "CHANGE_LOG_LIMIT", 3)
+    versions = []
+    for i in range(5):
+        _add(container, f"{i}.txt")
+        versions.append(get_knowledge_version(container))
+
+    stored = knowledge_store._get_container(container)
+    assert [v for v, _, _ in stored.changeLog] == versions[2:]
+    assert stored.changeLogBase == versions[1]
+
+    delta = list_knowledge_changes(container, versions[1])
+    assert [f["name"] for f in delta["added"]] == ["2.txt", "3.txt", "4.txt"]
+    assert delta["version"] == versions[-1]
+
+
+def test_since_outside_the_change_log_requires_a_full_listing(container, monkeypatch):
+    monkeypatch.setattr(knowledge_store, "CHANGE_LOG_LIMIT", 3)
+    initial = get_knowledge_version(container)
+    versions = []
+    for i in range(5):
+        _add(container, f"{i}.txt")
+        versions.append(get_knowledge_version(container))
+
+    assert list_knowledge_changes(container, initial) is None
+    assert list_knowledge_changes(container, versions[0]) is None
+    assert list_knowledge_changes(container, versions[-1] + 1) is None
+    assert list_knowledge_changes(container, versions[-1]) == {
+        "version": versions[-1],
+        "added": [],
+        "deleted": [],
+    }
+
+
+def test_updates_are_reported_as_added_and_deletions_win(container):
+    updated = _add(container, "updated.txt")
+    removed = _add(container, "removed.txt")
+    since = get_knowledge_version(container)
+
+    update_knowledge_file(container, updated, status=STATUS_READY, storedSize=7)
+    update_knowledge_file(container, removed, status=STATUS_READY)
+    delete_knowledge_file(container, removed)
+
+    delta = list_knowledge_changes(container, since)
+    assert [(f["id"], f["storedSize"]) for f in delta["added"]] == [(updated, 7)]
+    assert delta["deleted"] == [removed]
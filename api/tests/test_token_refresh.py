@@ -0,0 +1,212 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+from shared.token_refresh import TokenRefresher
+
+
+SCOPES = ["User.Read"]
+SESSION = {"home_account_id": "account-1", "token_cache": "serialized-cache"}
+
+
+class TokenEndpointStub:
+    """Local stand-in for the identity provider's token endpoint."""
+
+    def __init__(self, expires_in: int = 3600) -> None:
+        self.expires_in = expires_in
+        self.fail = False
+        self.requests: List[bool] = []
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def issue(self, force_refresh: bool) -> Optional[Dict[str, Any]]:
+        self.release.wait(timeout=5)
+        with self._lock:
+            self.requests.append(force_refresh)
+            if self.fail:
+                return None
+            return {"access_token": f"token-{len(self.requests)}", "expires_in": self.expires_in}
+
+
+class StubApp:
+    def __init__(self, endpoint: TokenEndpointStub, serialized_cache: Optional[str]) -> None:
+        self.endpoint = endpoint
+        self.serialized_cache = serialized_cache
+
+    def get_accounts(self, home_account_id=None):
+        return [{"home_account_id": home_account_id}]
+
+    def acquire_token_silent(self, scopes, account=None, force_refresh=False):
+        return self.endpoint.issue(force_refresh)
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Timers:
+    """Scheduler that records timers so tests decide when they fire."""
+
+    class Handle:
+        def __init__(self, delay: float, callback: Callable[[], None]) -> None:
+            self.delay = delay
+            self.callback = callback
+            self.cancelled = False
+
+        def cancel(self) -> None:
+            self.cancelled = True
+
+    def __init__(self) -> None:
+        self.handles: List["Timers.Handle"] = []
+
+    def __call__(self, delay: float, callback: Callable[[], None]) -> "Timers.Handle":
+        handle = Timers.Handle(delay, callback)
+        self.handles.append(handle)
+        return handle
+
+    def fire_pending(self) -> None:
+        for handle in [h for h in self.handles if not h.cancelled]:
+            handle.cancelled = True
+            handle.callback()
+
+
+@pytest.fixture
+def endpoint() -> TokenEndpointStub:
+    return TokenEndpointStub()
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture
+def timers() -> Timers:
+    return Timers()
+
+
+@pytest.fixture
+def refresher(endpoint, clock, timers) -> TokenRefresher:
+    return TokenRefresher(
+        app_factory=lambda cache: StubApp(endpoint, cache),
+        clock=clock,
+        refresh_margin=300,
+        idle_timeout=3600,
+        scheduler=timers,
+        retry_backoff=30,
+    )
+
+
+async def _settle(refresher: TokenRefresher) -> None:
+    """Wait for background refreshes started by the refresher."""
+
+    while refresher._inflight:
+        await asyncio.gather(*refresher._inflight.values())
+
+
+def test_concurrent_callers_share_one_refresh_of_expired_token(refresher, endpoint, clock):
+    async def scenario():
+        assert await refresher.get_token(SESSION, SCOPES) == "token-1"
+        clock.now += 4000  # past expiry
+
+        endpoint.release.clear()
+        callers = [asyncio.ensure_future(refresher.get_token(SESSION, SCOPES)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        endpoint.release.set()
+        return await asyncio.gather(*callers)
+
+    tokens = asyncio.run(scenario())
+
+    assert tokens == ["token-2"] * 5
+    assert endpoint.requests == [False, True]
+
+
+def test_refresh_inside_margin_serves_old_token_and_renews_in_background(
+    refresher, endpoint, clock
+):
+    async def scenario():
+        await refresher.get_token(SESSION, SCOPES)
+        clock.now += 3500  # 100s left, inside the 300s margin
+
+        served = await refresher.get_token(SESSION, SCOPES)
+        await _settle(refresher)
+        return served, await refresher.get_token(SESSION, SCOPES)
+
+    served, after = asyncio.run(scenario())
+
+    assert served == "token-1"
+    assert after == "token-2"
+    assert endpoint.requests == [False, True]
+
+
+def test_failed_refresh_falls_back_to_still_valid_token(refresher, endpoint, clock, timers):
+    async def scenario():
+        await refresher.get_token(SESSION, SCOPES)
+        clock.now += 3500
+        endpoint.fail = True
+
+        served = [await refresher.get_token(SESSION, SCOPES)]
+        await _settle(refresher)
+        # Within the backoff the failure is not retried, however many requests come in
+        for _ in range(5):
+            clock.now += 1
+            served.append(await refresher.get_token(SESSION, SCOPES))
+            await _settle(refresher)
+        assert len(endpoint.requests) == 2
+        assert timers.handles[-1].delay == 30
+
+        endpoint.fail = False
+        clock.now += 30
+        served.append(await refresher.get_token(SESSION, SCOPES))
+        await _settle(refresher)
+        return served, await refresher.get_token(SESSION, SCOPES)
+
+    served, after = asyncio.run(scenario())
+
+    assert served == ["token-1"] * 7
+    assert after == "token-3"
+    assert endpoint.requests == [False, True, True]
+
+
+def test_timer_renews_active_account_and_drops_idle_one(refresher, endpoint, clock, timers):
+    async def scenario():
+        await refresher.get_token(SESSION, SCOPES)
+        assert timers.handles[-1].delay == 3600 - 300
+
+        clock.now += 3300
+        timers.fire_pending()
+        await _settle(refresher)
+        renewed = await refresher.get_token(SESSION, SCOPES)
+
+        clock.now += 3300 + 3600  # idle for longer than idle_timeout
+        timers.fire_pending()
+        await _settle(refresher)
+        return renewed
+
+    renewed = asyncio.run(scenario())
+
+    assert renewed == "token-2"
+    assert endpoint.requests == [False, True]
+    assert refresher._tokens == {}
+
+
+def test_new_session_cache_is_used_for_next_refresh(refresher, endpoint, clock):
+    created: List[Optional[str]] = []
+    refresher._app_factory = lambda cache: created.append(cache) or StubApp(endpoint, cache)
+
+    async def scenario():
+        await refresher.get_token(SESSION, SCOPES)
+        clock.now += 3500
+        await refresher.get_token({**SESSION, "token_cache": "re-consented-cache"}, SCOPES)
+        await _settle(refresher)
+
+    asyncio.run(scenario())
+
+    assert created == ["serialized-cache", "re-consented-cache"]
@@ -46,6 +46,9 @@ export type KnowledgeFile = {
     type: string;
     size: number;
     uploadDate: string;
+    status?: 'pending' | 'ready' | 'failed';
+    storedSize?: number;
+    encoding?: string;
 };
 
 export interface FileForUpload {